@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Ahead-of-time compile the tick aggregation kernel with numba.pycc
+Usage: python build_aot.py
+
+Produces a candle_kernels extension module next to this script.
+kite_websocket.py imports it at startup when present, skipping the
+JIT compile (and the llvmlite import) entirely; when the module is
+missing it falls back to @njit and then to pure Python.
+
+Run this at deploy time, after any change to the kernel body below.
+The body must stay in sync with the @njit fallback in kite_websocket.py.
+"""
+
+from numba.pycc import CC
+
+cc = CC('candle_kernels')
+
+
+@cc.export('apply_ticks', 'void(i4[:], f8[:], i8[:], f8[:], f8[:], f8[:], f8[:], i8[:], i4[:])')
+def apply_ticks(idxs, prices, vols, o, h, l, c, v, cnt):
+    for k in range(idxs.shape[0]):
+        i = idxs[k]
+        price = prices[k]
+        if cnt[i] == 0:
+            o[i] = price
+            h[i] = price
+            l[i] = price
+        elif price > h[i]:
+            h[i] = price
+        elif price < l[i]:
+            l[i] = price
+        c[i] = price
+        v[i] = vols[k]
+        cnt[i] += 1
+
+
+if __name__ == "__main__":
+    cc.compile()
+    print("Built candle_kernels extension module")
@@ -28,15 +28,12 @@ def get_breakout_candle_data(kite, symbols):
     
     # Get instruments to map symbols to tokens
     instruments = kite.instruments("NSE")
-    symbol_to_token = {}
-    
-    for symbol in symbols:
-        for instrument in instruments:
-            if (instrument['tradingsymbol'] == symbol and 
-                instrument['segment'] == 'NSE' and 
-                instrument['instrument_type'] == 'EQ'):
-                symbol_to_token[symbol] = instrument['instrument_token']
-                break
+    # One pass over the instrument dump, then O(1) lookups per symbol
+    eq_tokens = {i['tradingsymbol']: i['instrument_token']
+                 for i in instruments
+                 if i['segment'] == 'NSE' and i['instrument_type'] == 'EQ'}
+    del instruments
+    symbol_to_token = {s: eq_tokens[s] for s in symbols if s in eq_tokens}
     
     # Get today's 9:15 AM candle (first 5-minute candle)
     from_time = datetime.now().replace(hour=9, minute=15, second=0, microsecond=0)
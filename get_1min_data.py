@@ -98,14 +98,13 @@ def main():
     if data:
         # Optionally save to JSON
         filename = f"{symbol.replace('NSE:', '')}_1min_data.json"
-        json_data = []
+        # Nothing reads the candles after this, so convert the dates in
+        # place instead of copying every candle dict
         for candle in data:
-            candle_copy = candle.copy()
-            candle_copy['date'] = candle_copy['date'].isoformat()
-            json_data.append(candle_copy)
-        
+            candle['date'] = candle['date'].isoformat()
+
         with open(filename, 'w') as f:
-            json.dump(json_data, f, indent=2)
+            json.dump(data, f, indent=2)
         
         print(f"\nData saved to {filename}")
 
@@ -6,7 +6,7 @@ import logging
 import threading
 import json
 import csv
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time as dtime
 from kiteconnect import KiteConnect
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
@@ -27,9 +27,11 @@ QUANTITY_MAP = {}
 POSITIONS_TAKEN = {}
 TRADES_TAKEN = []  # Store all trades for final output
 
-MARKET_START = datetime.strptime("09:21:00", "%H:%M:%S").time()
-MARKET_END = datetime.strptime("15:15:00", "%H:%M:%S").time()
-STRATEGY_END = datetime.strptime("15:00:00", "%H:%M:%S").time()
+# Plain time literals - no strptime parsing at import
+MARKET_START = dtime(9, 21)
+MARKET_END = dtime(15, 15)
+STRATEGY_END = dtime(15, 0)
+BACKTEST_END = dtime(15, 1)  # stop once the 3:01 PM candle is reached
 FROM_TIME_BREAKOUT = None  # Will be set based on command line date parameter
 
 TRADING_ACTIVE = True
@@ -52,7 +54,7 @@ class HistoricalBreakoutTrader:
         kite = self.kite
         
         # Set the FROM_TIME_BREAKOUT based on trading date
-        FROM_TIME_BREAKOUT = datetime.combine(self.trading_date, datetime.strptime("09:15:00", "%H:%M:%S").time())
+        FROM_TIME_BREAKOUT = datetime.combine(self.trading_date, dtime(9, 15))
         
         logger.info(f"Starting historical breakout trading for date: {self.trading_date}")
         logger.info(f"Breakout time set to: {FROM_TIME_BREAKOUT}")
@@ -65,7 +67,7 @@ class HistoricalBreakoutTrader:
         self.fetch_all_historical_data()
         
         # Initialize simulated time (always backtesting mode)
-        self.simulated_time = datetime.combine(self.trading_date, datetime.strptime("09:21:00", "%H:%M:%S").time())
+        self.simulated_time = datetime.combine(self.trading_date, MARKET_START)
         logger.info(f"Backtesting mode: Starting simulation at {self.simulated_time}")
         
         while TRADING_ACTIVE:
@@ -84,9 +86,8 @@ class HistoricalBreakoutTrader:
                     initialize_candle_data(self.trading_date)
                 
                 # Check if strategy should end when we reach 3:01 PM candle (use simulated time for backtest)
-                end_time = datetime.strptime("15:01:00", "%H:%M:%S").time()
-                logger.debug(f"Checking exit condition: {current_time_only} >= {end_time} = {current_time_only >= end_time}")
-                if current_time_only >= end_time:
+                logger.debug(f"Checking exit condition: {current_time_only} >= {BACKTEST_END} = {current_time_only >= BACKTEST_END}")
+                if current_time_only >= BACKTEST_END:
                     logger.info(f"Strategy ended - reached 3:01 PM candle | Simulated Time: {current_time_only}")
                     stop_trading_and_exit()
                     break
@@ -122,8 +123,8 @@ class HistoricalBreakoutTrader:
         global HISTORICAL_DATA_CACHE, SYMBOL_TO_TOKEN
         
         # Define the time range (always backtesting mode)
-        start_time = datetime.combine(self.trading_date, datetime.strptime("09:00:00", "%H:%M:%S").time())
-        end_time = datetime.combine(self.trading_date, datetime.strptime("15:30:00", "%H:%M:%S").time())
+        start_time = datetime.combine(self.trading_date, dtime(9, 0))
+        end_time = datetime.combine(self.trading_date, dtime(15, 30))
         
         logger.info(f"Backtesting mode: Fetching historical data from {start_time} to {end_time}")
         
@@ -348,10 +349,8 @@ def initialize_candle_data(trading_date=None):
     
     # For consistency with real-time, always use the exact same time range
     # Use 9:15 to 9:20 for the 5-minute breakout candle (same as real-time)
-    from_time_exact = datetime.combine(trading_date or datetime.now().date(), 
-                                      datetime.strptime("09:15:00", "%H:%M:%S").time())
-    to_time_exact = datetime.combine(trading_date or datetime.now().date(), 
-                                    datetime.strptime("09:20:00", "%H:%M:%S").time())
+    from_time_exact = datetime.combine(trading_date or datetime.now().date(), dtime(9, 15))
+    to_time_exact = datetime.combine(trading_date or datetime.now().date(), dtime(9, 20))
     
     for symbol in SYMBOLS:
         candles = kite.historical_data(SYMBOL_TO_TOKEN[symbol], from_time_exact, to_time_exact, "5minute")
@@ -415,16 +414,21 @@ def initialize_token_mappings():
     POSITIONS_TAKEN.clear()
     HISTORICAL_DATA_CACHE.clear()
     
+    # One pass over the instrument dump builds tradingsymbol -> token for
+    # NSE equities; each requested symbol is then an O(1) lookup instead
+    # of a rescan of the full list per symbol
+    eq_tokens = {i['tradingsymbol']: i['instrument_token']
+                 for i in instruments
+                 if i['segment'] == 'NSE' and i['instrument_type'] == 'EQ'}
+    del instruments
+
     for symbol in SYMBOLS:
-        for instrument in instruments:
-            if (instrument['tradingsymbol'] == symbol and 
-                instrument['segment'] == 'NSE' and 
-                instrument['instrument_type'] == 'EQ'):
-                token = instrument['instrument_token']
-                SYMBOL_TOKENS.append(token)
-                TOKEN_TO_SYMBOL[token] = symbol
-                SYMBOL_TO_TOKEN[symbol] = token
-                break
+        token = eq_tokens.get(symbol)
+        if token is None:
+            continue
+        SYMBOL_TOKENS.append(token)
+        TOKEN_TO_SYMBOL[token] = symbol
+        SYMBOL_TO_TOKEN[symbol] = token
     
     logger.info(f"Mapped {len(SYMBOL_TOKENS)} symbols")
 
@@ -606,8 +610,14 @@ def print_trade_summary():
         logger.info("No trades executed during this session")
         return
     
-    entry_trades = [t for t in TRADES_TAKEN if t['trade_type'] == 'ENTRY']
-    exit_trades = [t for t in TRADES_TAKEN if t['trade_type'] == 'EXIT']
+    # Partition in a single pass instead of two comprehensions
+    entry_trades = []
+    exit_trades = []
+    for t in TRADES_TAKEN:
+        if t['trade_type'] == 'ENTRY':
+            entry_trades.append(t)
+        else:
+            exit_trades.append(t)
     
     print("\n" + "="*60)
     print("TRADING SESSION SUMMARY")
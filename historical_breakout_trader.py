@@ -6,7 +6,8 @@ import logging
 import threading
 import json
 import csv
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, time as dtime
 from kiteconnect import KiteConnect
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
@@ -26,9 +27,10 @@ QUANTITY_MAP = {}
 POSITIONS_TAKEN = {}
 TRADES_TAKEN = []  # Store all trades for final output
 
-MARKET_START = datetime.strptime("09:21:00", "%H:%M:%S").time()
-MARKET_END = datetime.strptime("15:15:00", "%H:%M:%S").time()
-STRATEGY_END = datetime.strptime("15:00:00", "%H:%M:%S").time()
+# Plain time literals - no strptime parsing at import
+MARKET_START = dtime(9, 21)
+MARKET_END = dtime(15, 15)
+STRATEGY_END = dtime(15, 0)
 FROM_TIME_BREAKOUT = datetime.now().replace(hour=9, minute=15, second=0, microsecond=0)
 
 TRADING_ACTIVE = True
@@ -90,7 +92,7 @@ class HistoricalBreakoutTrader:
         
         sleep_duration = max(5, sleep_duration)
         
-        logger.debug(f"Sleeping {sleep_duration:.1f}s until next minute (current: {current_time.strftime('%H:%M:%S')})")
+        logger.debug("Sleeping %.1fs until next minute (current: %s)", sleep_duration, current_time.strftime('%H:%M:%S'))
         time.sleep(sleep_duration)
     
     def check_breakouts_from_historical_data(self, current_time):
@@ -100,7 +102,11 @@ class HistoricalBreakoutTrader:
         if self.last_checked_minute == previous_minute:
             return
         self.last_checked_minute = previous_minute
-        
+
+        # Match candles on integer minute-of-day so each comparison is a
+        # single int equality instead of datetime replace() allocations
+        previous_minute_mod = previous_minute.hour * 60 + previous_minute.minute
+
         for symbol in SYMBOLS:
             if symbol in POSITIONS_TAKEN:
                 continue
@@ -116,23 +122,24 @@ class HistoricalBreakoutTrader:
                     to_date=to_time,
                     interval="minute"
                 )
-                logger.info(f"{symbol} - Historical data: {historical_data}")
+                # %-style and DEBUG so the full payload is never formatted in the
+                # per-minute loop unless explicitly enabled
+                logger.debug("%s - Historical data: %s", symbol, historical_data)
                 if not historical_data:
                     logger.error(f"{symbol} - No historical data found")
                     continue
                 
                 target_candle = None
                 for candle in reversed(historical_data):
-                    candle_time = candle['date'].replace(tzinfo=None)
-                    candle_minute = candle_time.replace(second=0, microsecond=0)
-                    if candle_minute == previous_minute:
+                    candle_date = candle['date']
+                    if candle_date.hour * 60 + candle_date.minute == previous_minute_mod:
                         target_candle = candle
-                        logger.info(f"{symbol} - {candle_minute.strftime('%H:%M:%S')} close: {candle['close']:.2f}")
+                        logger.info("%s - %s close: %.2f", symbol, candle_date.strftime('%H:%M:%S'), candle['close'])
                         break
-                
+
                 if not target_candle:
                     logger.error(f"{symbol} - No candle found for {previous_minute.strftime('%H:%M')}")
-                    logger.error(f"{symbol} - Available candle times: {[c['date'].replace(tzinfo=None).strftime('%H:%M') for c in historical_data]}")
+                    logger.error(f"{symbol} - Available candle times: {[c['date'].strftime('%H:%M') for c in historical_data]}")
                     continue
                 
                 quantity = QUANTITY_MAP[symbol]
@@ -307,16 +314,21 @@ def initialize_token_mappings():
     SYMBOL_TO_TOKEN.clear()
     POSITIONS_TAKEN.clear()
     
+    # One pass over the instrument dump builds tradingsymbol -> token for
+    # NSE equities; each requested symbol is then an O(1) lookup instead
+    # of a rescan of the full list per symbol
+    eq_tokens = {i['tradingsymbol']: i['instrument_token']
+                 for i in instruments
+                 if i['segment'] == 'NSE' and i['instrument_type'] == 'EQ'}
+    del instruments
+
     for symbol in SYMBOLS:
-        for instrument in instruments:
-            if (instrument['tradingsymbol'] == symbol and 
-                instrument['segment'] == 'NSE' and 
-                instrument['instrument_type'] == 'EQ'):
-                token = instrument['instrument_token']
-                SYMBOL_TOKENS.append(token)
-                TOKEN_TO_SYMBOL[token] = symbol
-                SYMBOL_TO_TOKEN[symbol] = token
-                break
+        token = eq_tokens.get(symbol)
+        if token is None:
+            continue
+        SYMBOL_TOKENS.append(token)
+        TOKEN_TO_SYMBOL[token] = symbol
+        SYMBOL_TO_TOKEN[symbol] = token
     
     logger.info(f"Mapped {len(SYMBOL_TOKENS)} symbols")
 
@@ -357,7 +369,7 @@ def closeAllPositions():
         
         logger.info(f"Closing {len(open_positions)} positions based on Kite API data...")
         
-        for position in open_positions:
+        def close_one(position):
             try:
                 symbol = position['tradingsymbol']
                 quantity = abs(position['quantity'])  # Use absolute value
@@ -402,7 +414,16 @@ def closeAllPositions():
                 logger.info(f"{symbol} CLOSE {action} {order_id} Qty:{quantity} (API Position: {position['quantity']})")
                 
             except Exception as e:
-                logger.error(f"{symbol} CLOSE FAILED: {e}")
+                logger.error(f"{position['tradingsymbol']} CLOSE FAILED: {e}")
+        
+        # Overlap the per-position REST round-trips instead of paying
+        # them serially while prices move at market close; shut the pool
+        # down without waiting so the 30s bound actually holds
+        pool = ThreadPoolExecutor(max_workers=8)
+        _, pending = wait([pool.submit(close_one, p) for p in open_positions], timeout=30)
+        if pending:
+            logger.error(f"{len(pending)} close orders still in flight after 30s")
+        pool.shutdown(wait=False)
         
         # Clear our local tracking since we're closing everything
         POSITIONS_TAKEN.clear()
@@ -434,13 +455,19 @@ def cancelAllOrders():
         
         logger.info(f"Cancelling {len(open_orders)} open orders based on Kite API data...")
         
-        for order in open_orders:
+        def cancel_one(order):
             try:
                 # kite.cancel_order(order_id=order['order_id'], variety=order['variety'])
                 order_type_desc = f"{order['order_type']}" + (f" (SL@{order['trigger_price']})" if order['order_type'] in ['SL', 'SLM'] else "")
                 logger.info(f"Cancelled {order['tradingsymbol']} {order['order_id']} {order_type_desc}")
             except Exception as e:
                 logger.error(f"Cancel failed {order['tradingsymbol']} {order['order_id']}: {e}")
+        
+        pool = ThreadPoolExecutor(max_workers=8)
+        _, pending = wait([pool.submit(cancel_one, o) for o in open_orders], timeout=30)
+        if pending:
+            logger.error(f"{len(pending)} cancels still in flight after 30s")
+        pool.shutdown(wait=False)
                 
     except Exception as e:
         logger.error(f"Failed to fetch orders from API: {e}")
@@ -494,8 +521,14 @@ def print_trade_summary():
         logger.info("No trades executed during this session")
         return
     
-    entry_trades = [t for t in TRADES_TAKEN if t['trade_type'] == 'ENTRY']
-    exit_trades = [t for t in TRADES_TAKEN if t['trade_type'] == 'EXIT']
+    # Partition in a single pass instead of two comprehensions
+    entry_trades = []
+    exit_trades = []
+    for t in TRADES_TAKEN:
+        if t['trade_type'] == 'ENTRY':
+            entry_trades.append(t)
+        else:
+            exit_trades.append(t)
     
     print("\n" + "="*60)
     print("TRADING SESSION SUMMARY")
@@ -1,11 +1,34 @@
 #!/usr/bin/env python3
 import argparse
+import os
+import socket
 import sys
 import time
 import logging
 import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from kiteconnect import KiteTicker, KiteConnect
+from kiteconnect import ticker as kite_ticker
+
+# Decode the ticker's JSON control frames (order postbacks, subscribe acks)
+# with orjson (or ujson) when available - 3-6x faster than stdlib json on
+# these messages. Outbound frames keep stdlib dumps since the ticker
+# sends them as str. Binary tick packets never touch JSON.
+import json
+try:
+    import orjson
+    _fast_loads = orjson.loads
+except ImportError:
+    try:
+        import ujson
+        _fast_loads = ujson.loads
+    except ImportError:
+        _fast_loads = None
+if _fast_loads is not None:
+    from types import SimpleNamespace
+    kite_ticker.json = SimpleNamespace(loads=_fast_loads, dumps=json.dumps)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
                    handlers=[logging.FileHandler('kite_websocket.log'), logging.StreamHandler(sys.stdout)])
@@ -15,7 +38,70 @@ SYMBOLS = []
 SYMBOL_TOKENS = []
 TOKEN_TO_SYMBOL = {}
 SYMBOL_TO_TOKEN = {}
+TOKEN_TO_IDX = {}
+SYMBOL_BY_IDX = []
 CANDLE_MAP = {}
+
+# Preallocated tick-batch buffers, filled in place by on_ticks so no
+# fresh arrays are allocated per callback
+MAX_TICKS_PER_BATCH = 2048
+IDX_BUF = np.empty(MAX_TICKS_PER_BATCH, dtype=np.int32)
+LTP_BUF = np.empty(MAX_TICKS_PER_BATCH, dtype=np.float64)
+VOL_BUF = np.empty(MAX_TICKS_PER_BATCH, dtype=np.int64)
+
+# Per-symbol 1-minute candles as a struct-of-arrays block indexed by the
+# dense symbol index - OHLC updates are plain array writes, no dicts
+CANDLE_DTYPE = np.dtype([('o', 'f8'), ('h', 'f8'), ('l', 'f8'), ('c', 'f8'),
+                         ('v', 'i8'), ('n', 'i4')])
+CUR_CANDLE = None  # allocated once symbol count is known
+CUR_MINUTE = -1
+
+# Breakout thresholds and order quantity as flat arrays indexed by the
+# dense symbol index - constants after 9:20, so the tick path reads
+# scalars instead of chasing candle/quantity dicts
+BO_HIGH = None
+BO_LOW = None
+QTY = None
+
+# Constant place_order kwargs per symbol and side, built once at
+# breakout time; hot-path order calls only add the varying fields
+ENTRY_TMPL = {}    # (symbol, direction) -> market-order kwargs
+SL_TMPL = {}       # (symbol, direction of position) -> SL-M kwargs
+
+# Compiled kernel for the per-tick OHLC update; the batch loop runs as
+# native code with the GIL released. Preference order: the AOT module
+# built by build_aot.py (no compile cost, no llvmlite import), then a
+# JIT compile via numba, then the pure-Python loop in update_candles.
+try:
+    from candle_kernels import apply_ticks as _apply_ticks
+except ImportError:
+    try:
+        from numba import njit
+
+        @njit(cache=True, nogil=True)
+        def _apply_ticks(idxs, prices, vols, o, h, l, c, v, cnt):
+            for k in range(idxs.shape[0]):
+                i = idxs[k]
+                price = prices[k]
+                if cnt[i] == 0:
+                    o[i] = price
+                    h[i] = price
+                    l[i] = price
+                elif price > h[i]:
+                    h[i] = price
+                elif price < l[i]:
+                    l[i] = price
+                c[i] = price
+                v[i] = vols[k]
+                cnt[i] += 1
+    except ImportError:
+        _apply_ticks = None
+
+candle_logger = logging.getLogger('candles')
+candle_handler = logging.FileHandler('trading_candles.log', delay=True)
+candle_handler.setFormatter(logging.Formatter('%(message)s'))
+candle_logger.addHandler(candle_handler)
+candle_logger.propagate = False
 candles_initialized = False
 INITIAL_CAPITAL = 360000
 AVAILABLE_CAPITAL = INITIAL_CAPITAL
@@ -23,15 +109,34 @@ TOTAL_RISK_PERCENTAGE = 0.02
 QUANTITY_MAP = {}
 POSITIONS_TAKEN = {}
 
-MARKET_START = datetime.strptime("09:21:00", "%H:%M:%S").time()
-MARKET_END = datetime.strptime("15:15:00", "%H:%M:%S").time()
-STRATEGY_END = datetime.strptime("15:00:00", "%H:%M:%S").time()
+# Market boundaries as integer seconds-since-midnight so the hot path
+# compares plain numbers instead of allocating datetime.time objects
+MARKET_START_S = 9 * 3600 + 21 * 60
+MARKET_END_S = 15 * 3600 + 15 * 60
+STRATEGY_END_S = 15 * 3600
+MIDNIGHT_TS = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
 #FROM_TIME_BREAKOUT = datetime(2025, 9, 5, 9, 15, 0)
 FROM_TIME_BREAKOUT = datetime.now().replace(hour=9, minute=15, second=0, microsecond=0)
 
-TRADING_ACTIVE = True
+# Minute bucket of the last "market not open" log line, so the idle
+# feed before 9:21 writes one line per minute instead of one per batch
+_last_idle_log_min = -1
+
+# Single-writer design: the ticker callback is the only thread mutating
+# candle state, so no lock is held on the tick path. The exit thread
+# signals shutdown through this event instead of racing on a global.
+SHUTDOWN = threading.Event()
+
+# Pairs the check-and-reserve on AVAILABLE_CAPITAL with the rollback on
+# the order pool's failure path - augmented assignment on a global is
+# not atomic across threads
+CAPITAL_LOCK = threading.Lock()
 kite = None
 
+# Order placement runs on this pool so a 50-300ms REST round-trip never
+# stalls tick processing on the websocket thread
+ORDER_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix='orders')
+
 class KiteWebSocket:
     def __init__(self, api_key, access_token):
         self.api_key = api_key
@@ -50,48 +155,89 @@ class KiteWebSocket:
         self.kws.on_noreconnect = self.on_noreconnect
     
     def on_ticks(self, ws, ticks):
-        global CANDLE_MAP, candles_initialized, TOKEN_TO_SYMBOL, QUANTITY_MAP, kite, TRADING_ACTIVE
-        
-        if not TRADING_ACTIVE:
+        global CANDLE_MAP, candles_initialized, TOKEN_TO_SYMBOL, QUANTITY_MAP, kite
+
+        if SHUTDOWN.is_set():
             return
-            
-        current_time = datetime.now().time()
-        if current_time < MARKET_START or current_time > MARKET_END :
-            logger.info(f"Market not started yet or ended | Current Time: {current_time}")
+
+        # Two float compares per batch; real time objects are only built
+        # on the cold branches that log
+        sec_of_day = time.time() - MIDNIGHT_TS
+        if sec_of_day < MARKET_START_S or sec_of_day > MARKET_END_S:
+            global _last_idle_log_min
+            idle_min = int(sec_of_day) // 60
+            if idle_min != _last_idle_log_min:
+                _last_idle_log_min = idle_min
+                logger.info("Market not started yet or ended | Current Time: %s", datetime.now().time())
             return
 
-        if current_time >= STRATEGY_END:   
-            logger.info(f"Strategy ended | Current Time: {current_time}")
+        if sec_of_day >= STRATEGY_END_S:
+            logger.info("Strategy ended | Current Time: %s", datetime.now().time())
             stop_trading_and_exit(ws)
             return
 
         if not candles_initialized:
-            logger.info(f"Candles not initialized | Current Time: {current_time}")
+            logger.info("Candles not initialized | Current Time: %s", datetime.now().time())
             initialize_candle_data()
 
+        # Fill the preallocated buffers in place, then dispatch off the
+        # filled slice - no per-batch list/array allocations. The bound
+        # .get is the token filter: one C-level lookup per tick, and
+        # unknown tokens are simply skipped.
+        n = 0
+        get_idx = TOKEN_TO_IDX.get
+        idx_buf = IDX_BUF
+        ltp_buf = LTP_BUF
+        vol_buf = VOL_BUF
         for tick in ticks:
-            token = tick['instrument_token']
-            symbol = TOKEN_TO_SYMBOL[token]
-            quantity = QUANTITY_MAP[symbol]
-            lookfor_buy_sell(symbol, quantity, tick['last_price'])
+            i = get_idx(tick['instrument_token'])
+            if i is None:
+                continue
+            idx_buf[n] = i
+            ltp_buf[n] = tick['last_price']
+            vol_buf[n] = tick.get('volume_traded', 0)
+            n += 1
+
+        update_candles(n)
+
+        # Evaluate the breakout condition for the whole batch in two
+        # vectorized compares; Python-level dispatch only runs for the
+        # (rare) ticks that actually cross a threshold
+        idxs = IDX_BUF[:n]
+        ltps = LTP_BUF[:n]
+        hits = np.flatnonzero((ltps > BO_HIGH[idxs]) | (ltps < BO_LOW[idxs]))
+        for k in hits:
+            lookfor_buy_sell(idxs[k], ltps[k])
     
     def on_connect(self, ws, response):
         logger.info("Connected")
+        self.tune_socket()
+        self._resubscribe(ws)
+
+    def _resubscribe(self, ws):
         if self.tokens and self.mode is not None:
             ws.subscribe(self.tokens)
             ws.set_mode(self.mode, self.tokens)
-            logger.info(f"Subscribed {len(self.tokens)} symbols")
+            logger.info("Subscribed %d symbols", len(self.tokens))
+
+    def tune_socket(self):
+        """Disable Nagle and widen the receive buffer on the tick socket"""
+        try:
+            sock = self.kws.ws.transport.getHandle()
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+            logger.info("Socket tuned: TCP_NODELAY on, 4MB receive buffer")
+        except Exception as e:
+            logger.error("Socket tuning failed: %s", e)
     
     def on_close(self, ws, code, reason):
         pass
     
     def on_error(self, ws, code, reason):
-        logger.error(f"WS Error: {reason}")
+        logger.error("WS Error: %s", reason)
     
     def on_reconnect(self, ws, attempts_count):
-        if self.tokens and self.mode is not None:
-            ws.subscribe(self.tokens)
-            ws.set_mode(self.mode, self.tokens)
+        self._resubscribe(ws)
     
     def on_noreconnect(self, ws):
         pass
@@ -107,7 +253,7 @@ class KiteWebSocket:
             logger.info("Starting connection...")
             self.kws.connect()
         except Exception as e:
-            logger.error(f"Connection error: {e}")
+            logger.error("Connection error: %s", e)
 
 def initialize_candle_data():
     global CANDLE_MAP, candles_initialized, SYMBOLS, SYMBOL_TO_TOKEN, QUANTITY_MAP, kite
@@ -115,142 +261,275 @@ def initialize_candle_data():
     
     logger.info("Getting 5min candles...")
     
+    to_time = datetime.now()
     for symbol in SYMBOLS:
-        candles = kite.historical_data(SYMBOL_TO_TOKEN[symbol], FROM_TIME_BREAKOUT, datetime.now(), "5minute")
-        logger.info(f"{symbol} | Full JSON Response: {candles}")
+        candles = kite.historical_data(SYMBOL_TO_TOKEN[symbol], FROM_TIME_BREAKOUT, to_time, "5minute")
+        # %-style so the full payload is only formatted when DEBUG is on
+        logger.debug("%s | Full JSON Response: %s", symbol, candles)
+        logger.info("%s | %d candles fetched", symbol, len(candles))
         first_candle = candles[0]
-        CANDLE_MAP[symbol] = [first_candle]
-        logger.info(f"{symbol} | O:{first_candle['open']:.2f} H:{first_candle['high']:.2f} "
-                  f"L:{first_candle['low']:.2f} C:{first_candle['close']:.2f}")
+        CANDLE_MAP[symbol] = first_candle
+        logger.info("%s | O:%.2f H:%.2f L:%.2f C:%.2f", symbol, first_candle['open'],
+                    first_candle['high'], first_candle['low'], first_candle['close'])
     
     total_risk = INITIAL_CAPITAL * TOTAL_RISK_PERCENTAGE
     per_stock_risk = total_risk / len(SYMBOLS)
     
     for symbol in SYMBOLS:
-        candle = CANDLE_MAP[symbol][0]
+        candle = CANDLE_MAP[symbol]
         breakout_range = abs(candle['high'] - candle['low'])
         quantity = max(1, int(per_stock_risk / breakout_range))
         QUANTITY_MAP[symbol] = quantity
-        logger.info(f"{symbol} Range:{breakout_range:.2f} Qty:{quantity} perStockRisk:{per_stock_risk:.2f}")
-    
+        logger.info("%s Range:%.2f Qty:%d perStockRisk:%.2f", symbol, breakout_range, quantity, per_stock_risk)
+
+    for symbol in SYMBOL_BY_IDX:
+        base = {'variety': kite.VARIETY_REGULAR, 'tradingsymbol': symbol,
+                'exchange': kite.EXCHANGE_NSE, 'product': kite.PRODUCT_MIS,
+                'validity': kite.VALIDITY_DAY}
+        ENTRY_TMPL[(symbol, 'BUY')] = dict(base, transaction_type=kite.TRANSACTION_TYPE_BUY,
+                                           order_type=kite.ORDER_TYPE_MARKET)
+        ENTRY_TMPL[(symbol, 'SELL')] = dict(base, transaction_type=kite.TRANSACTION_TYPE_SELL,
+                                            order_type=kite.ORDER_TYPE_MARKET)
+        # Stop loss is the opposite side of the position
+        SL_TMPL[(symbol, 'BUY')] = dict(base, transaction_type=kite.TRANSACTION_TYPE_SELL,
+                                        order_type=kite.ORDER_TYPE_SLM)
+        SL_TMPL[(symbol, 'SELL')] = dict(base, transaction_type=kite.TRANSACTION_TYPE_BUY,
+                                         order_type=kite.ORDER_TYPE_SLM)
+
+    global BO_HIGH, BO_LOW, QTY
+    n_sym = len(SYMBOL_BY_IDX)
+    BO_HIGH = np.full(n_sym, np.inf)
+    BO_LOW = np.full(n_sym, -np.inf)
+    QTY = np.zeros(n_sym, dtype=np.int64)
+    for i, symbol in enumerate(SYMBOL_BY_IDX):
+        candle = CANDLE_MAP.get(symbol)
+        if candle is None:
+            continue
+        BO_HIGH[i] = candle['high']
+        BO_LOW[i] = candle['low']
+        QTY[i] = QUANTITY_MAP[symbol]
+
     candles_initialized = True
-    logger.info(f"Candles initialized | Available Capital: {AVAILABLE_CAPITAL:.0f}")
+    logger.info("Candles initialized | Available Capital: %.0f", AVAILABLE_CAPITAL)
+
+def update_candles(n):
+    """Apply a tick batch to the per-symbol 1-minute candle arrays"""
+    global CUR_MINUTE
+
+    minute_bucket = int(time.time()) // 60
+    if minute_bucket != CUR_MINUTE:
+        if CUR_MINUTE != -1:
+            complete_candles(CUR_MINUTE)
+        CUR_MINUTE = minute_bucket
+
+    if _apply_ticks is not None:
+        _apply_ticks(IDX_BUF[:n], LTP_BUF[:n], VOL_BUF[:n],
+                     CUR_CANDLE['o'], CUR_CANDLE['h'], CUR_CANDLE['l'],
+                     CUR_CANDLE['c'], CUR_CANDLE['v'], CUR_CANDLE['n'])
+        return
+
+    # Pure-Python fallback mirrors the kernel: field views bound once,
+    # and an if/elif chain since a tick can't be both new high and new low
+    o, h, l, c = CUR_CANDLE['o'], CUR_CANDLE['h'], CUR_CANDLE['l'], CUR_CANDLE['c']
+    v, cnt = CUR_CANDLE['v'], CUR_CANDLE['n']
+    for k in range(n):
+        i = IDX_BUF[k]
+        price = LTP_BUF[k]
+        if cnt[i] == 0:
+            o[i] = price
+            h[i] = price
+            l[i] = price
+        elif price > h[i]:
+            h[i] = price
+        elif price < l[i]:
+            l[i] = price
+        c[i] = price
+        v[i] = VOL_BUF[k]
+        cnt[i] += 1
+
+def complete_candles(minute_bucket):
+    """Log the finished minute's candles and reset the arrays in place"""
+    if minute_bucket < 0:
+        return
+
+    # Skip the CSV formatting entirely when the candle log is disabled
+    if not candle_logger.isEnabledFor(logging.INFO):
+        CUR_CANDLE[:] = 0
+        return
+
+    # One strftime for the shared date/time prefix of every row
+    stamp = datetime.fromtimestamp(minute_bucket * 60).strftime('%Y-%m-%d,%H:%M')
+
+    # One vectorized mask picks the symbols that actually ticked; only
+    # those reach Python-level string formatting. A single record per
+    # rollover - one format+lock+write instead of one per symbol.
+    active = np.flatnonzero(CUR_CANDLE['n'] > 0)
+    if active.size:
+        o, h, l, c = CUR_CANDLE['o'], CUR_CANDLE['h'], CUR_CANDLE['l'], CUR_CANDLE['c']
+        v, cnt = CUR_CANDLE['v'], CUR_CANDLE['n']
+        rows = [f"{stamp},{SYMBOL_BY_IDX[i]},"
+                f"{o[i]:.2f},{h[i]:.2f},{l[i]:.2f},{c[i]:.2f},{v[i]},{cnt[i]}"
+                for i in active]
+        candle_logger.info('\n'.join(rows))
+        CUR_CANDLE[active] = 0
 
 def place_stop_loss_order(symbol, quantity, direction, stop_loss_price):
 
     global kite
     
     try:
-        sl_transaction_type = kite.TRANSACTION_TYPE_SELL if direction == 'BUY' else kite.TRANSACTION_TYPE_BUY
         position_type = "LONG" if direction == 'BUY' else "SHORT"
+
+        sl_order_id = kite.place_order(**SL_TMPL[(symbol, direction)],
+                                       quantity=quantity, trigger_price=stop_loss_price)
         
-        sl_order_id = kite.place_order(
-            variety=kite.VARIETY_REGULAR,
-            tradingsymbol=symbol,
-            exchange=kite.EXCHANGE_NSE,
-            transaction_type=sl_transaction_type,
-            quantity=quantity,
-            order_type=kite.ORDER_TYPE_SLM,
-            trigger_price=stop_loss_price,
-            product=kite.PRODUCT_MIS,
-            validity=kite.VALIDITY_DAY
-        )
-        
-        logger.info(f"{symbol} STOP LOSS {sl_order_id} @ {stop_loss_price:.2f} for {position_type} position")
+        logger.info("%s STOP LOSS %s @ %.2f for %s position", symbol, sl_order_id, stop_loss_price, position_type)
         return {'stop_loss_order_id': sl_order_id, 'stop_loss_price': stop_loss_price}
         
     except Exception as e:
-        logger.error(f"{symbol} STOP LOSS FAILED: {e}")
+        logger.error("%s STOP LOSS FAILED: %s", symbol, e)
         return None
 
+EQ_TOKEN_MAP = {}
+
 def initialize_token_mappings():
     global SYMBOLS, SYMBOL_TOKENS, TOKEN_TO_SYMBOL, SYMBOL_TO_TOKEN, AVAILABLE_CAPITAL, INITIAL_CAPITAL, kite
-    
-    instruments = kite.instruments("NSE")
+
+    # One pass over the instrument dump keyed on a wanted-set membership
+    # test - only the requested symbols are retained, not the full
+    # NSE-EQ universe, and the pass stops costing anything once every
+    # symbol is found. The map is kept so a re-init doesn't re-fetch
+    # the ~5MB instrument dump.
+    if not EQ_TOKEN_MAP:
+        instruments = kite.instruments("NSE")
+        wanted = set(SYMBOLS)
+        for inst in instruments:
+            sym = inst['tradingsymbol']
+            if sym in wanted and inst['segment'] == 'NSE' and inst['instrument_type'] == 'EQ':
+                EQ_TOKEN_MAP[sym] = inst['instrument_token']
+                wanted.discard(sym)
+        if wanted:
+            logger.error("Tokens not found for: %s", ', '.join(sorted(wanted)))
+        del instruments
+
     SYMBOL_TOKENS.clear()
     TOKEN_TO_SYMBOL.clear()
     SYMBOL_TO_TOKEN.clear()
+    TOKEN_TO_IDX.clear()
+    SYMBOL_BY_IDX.clear()
     POSITIONS_TAKEN.clear()
 
-    
+
     for symbol in SYMBOLS:
-        for instrument in instruments:
-            if (instrument['tradingsymbol'] == symbol and 
-                instrument['segment'] == 'NSE' and 
-                instrument['instrument_type'] == 'EQ'):
-                token = instrument['instrument_token']
-                SYMBOL_TOKENS.append(token)
-                TOKEN_TO_SYMBOL[token] = symbol
-                SYMBOL_TO_TOKEN[symbol] = token
-                break
-    
-    logger.info(f"Mapped {len(SYMBOL_TOKENS)} symbols")
+        token = EQ_TOKEN_MAP.get(symbol)
+        if token is None:
+            continue
+        SYMBOL_TOKENS.append(token)
+        TOKEN_TO_SYMBOL[token] = symbol
+        SYMBOL_TO_TOKEN[symbol] = token
+        TOKEN_TO_IDX[token] = len(SYMBOL_BY_IDX)
+        SYMBOL_BY_IDX.append(symbol)
 
-def lookfor_buy_sell(symbol, quantity, ltp):
-    global CANDLE_MAP, POSITIONS_TAKEN, AVAILABLE_CAPITAL, kite
+    global CUR_CANDLE
+    CUR_CANDLE = np.zeros(len(SYMBOL_BY_IDX), dtype=CANDLE_DTYPE)
+
+    # Warm the numba kernel on an empty batch so JIT compilation (first
+    # run, or a cold cache) happens at startup instead of on the first
+    # live tick batch
+    if _apply_ticks is not None:
+        _apply_ticks(IDX_BUF[:0], LTP_BUF[:0], VOL_BUF[:0],
+                     CUR_CANDLE['o'], CUR_CANDLE['h'], CUR_CANDLE['l'],
+                     CUR_CANDLE['c'], CUR_CANDLE['v'], CUR_CANDLE['n'])
+
+    # One stat() to decide whether the header is needed - never read the
+    # (potentially large) prior-day log back in
+    try:
+        needs_header = os.path.getsize('trading_candles.log') == 0
+    except OSError:
+        needs_header = True
+    if needs_header:
+        candle_logger.info("Date,Time,Symbol,Open,High,Low,Close,Volume,Ticks")
     
-    if symbol in POSITIONS_TAKEN:
+    logger.info("Mapped %d symbols", len(SYMBOL_TOKENS))
+
+def lookfor_buy_sell(i, ltp):
+    global POSITIONS_TAKEN, AVAILABLE_CAPITAL, kite
+
+    symbol = SYMBOL_BY_IDX[i]
+
+    # Single .get instead of an `in` probe - one hash of symbol on the
+    # hot no-position path instead of two
+    if POSITIONS_TAKEN.get(symbol) is not None:
         return
-    
-    candle = CANDLE_MAP[symbol][0]
-    deployed_capital = quantity * ltp
-    
-    if deployed_capital > AVAILABLE_CAPITAL:
-        logger.info(f"{symbol} SKIP - Need:{deployed_capital:.0f} Available:{AVAILABLE_CAPITAL:.0f}")
+
+    if ltp > BO_HIGH[i]:
+        # Stop loss at low of breakout candle for LONG position
+        direction = 'BUY'
+        stop_loss_price = float(BO_LOW[i])
+    elif ltp < BO_LOW[i]:
+        # Stop loss at high of breakout candle for SHORT position
+        direction = 'SELL'
+        stop_loss_price = float(BO_HIGH[i])
+    else:
         return
-    
-    if ltp > candle['high']:
-        try:
-            order_id = kite.place_order(variety=kite.VARIETY_REGULAR, tradingsymbol=symbol, 
-                                      exchange=kite.EXCHANGE_NSE, transaction_type=kite.TRANSACTION_TYPE_BUY,
-                                      quantity=quantity, order_type=kite.ORDER_TYPE_MARKET,
-                                      product=kite.PRODUCT_MIS, validity=kite.VALIDITY_DAY)
-            AVAILABLE_CAPITAL -= deployed_capital
-            logger.info(f"{symbol} BUY {order_id} @ {ltp:.2f} Qty:{quantity} Deployed:{deployed_capital:.0f} Remaining:{AVAILABLE_CAPITAL:.0f}")
-            
-            # Place stop loss at low of breakout candle for LONG position
-            stop_loss_price = candle['low']
-            sl_info = place_stop_loss_order(symbol, quantity, 'BUY', stop_loss_price)
-            
-            # Update position tracking
-            position_data = {'direction': 'BUY', 'quantity': quantity, 'price': ltp}
-            if sl_info:
-                position_data.update(sl_info)
-            POSITIONS_TAKEN[symbol] = position_data
-                
-        except Exception as e:
-            logger.error(f"{symbol} BUY FAILED: {e}")
-            
-    elif ltp < candle['low']:
-        try:
-            order_id = kite.place_order(variety=kite.VARIETY_REGULAR, tradingsymbol=symbol,
-                                      exchange=kite.EXCHANGE_NSE, transaction_type=kite.TRANSACTION_TYPE_SELL,
-                                      quantity=quantity, order_type=kite.ORDER_TYPE_MARKET,
-                                      product=kite.PRODUCT_MIS, validity=kite.VALIDITY_DAY)
-            AVAILABLE_CAPITAL -= deployed_capital
-            logger.info(f"{symbol} SELL {order_id} @ {ltp:.2f} Qty:{quantity} Deployed:{deployed_capital:.0f} Remaining:{AVAILABLE_CAPITAL:.0f}")
-            
-            # Place stop loss at high of breakout candle for SHORT position
-            stop_loss_price = candle['high']
-            sl_info = place_stop_loss_order(symbol, quantity, 'SELL', stop_loss_price)
-            
-            # Update position tracking
-            position_data = {'direction': 'SELL', 'quantity': quantity, 'price': ltp}
-            if sl_info:
-                position_data.update(sl_info)
-            POSITIONS_TAKEN[symbol] = position_data
-                
-        except Exception as e:
-            logger.error(f"{symbol} SELL FAILED: {e}")
+
+    quantity = int(QTY[i])
+    deployed_capital = quantity * ltp
+
+    # Reserve the position and capital before the order leaves the pool
+    # so the next tick can't double-enter while the HTTP call is in flight
+    with CAPITAL_LOCK:
+        if deployed_capital > AVAILABLE_CAPITAL:
+            logger.info("%s SKIP - Need:%.0f Available:%.0f", symbol, deployed_capital, AVAILABLE_CAPITAL)
+            return
+        AVAILABLE_CAPITAL -= deployed_capital
+    POSITIONS_TAKEN[symbol] = {'direction': direction, 'quantity': quantity, 'price': ltp}
+    # Disarm the thresholds so the vectorized scan in on_ticks stops
+    # flagging this symbol; they are restored if the order fails
+    BO_HIGH[i] = np.inf
+    BO_LOW[i] = -np.inf
+    ORDER_POOL.submit(execute_entry_order, symbol, quantity, ltp, direction,
+                      stop_loss_price, deployed_capital, i)
+
+def execute_entry_order(symbol, quantity, ltp, direction, stop_loss_price, deployed_capital, i):
+    """Place the entry + stop loss orders (runs on the order pool)"""
+    global AVAILABLE_CAPITAL, kite
+
+    try:
+        order_id = kite.place_order(**ENTRY_TMPL[(symbol, direction)], quantity=quantity)
+        logger.info("%s %s %s @ %.2f Qty:%d Deployed:%.0f Remaining:%.0f", symbol, direction, order_id, ltp, quantity, deployed_capital, AVAILABLE_CAPITAL)
+
+        sl_info = place_stop_loss_order(symbol, quantity, direction, stop_loss_price)
+        if sl_info:
+            POSITIONS_TAKEN[symbol].update(sl_info)
+
+    except Exception as e:
+        logger.error("%s %s FAILED: %s", symbol, direction, e)
+        # Release the reservation so the symbol can be retried
+        with CAPITAL_LOCK:
+            AVAILABLE_CAPITAL += deployed_capital
+        POSITIONS_TAKEN.pop(symbol, None)
+        candle = CANDLE_MAP[symbol]
+        BO_HIGH[i] = candle['high']
+        BO_LOW[i] = candle['low']
 
 def stop_trading_and_exit(ws=None):
-    global TRADING_ACTIVE
+    # First caller wins; on_ticks bails on SHUTDOWN so the ticker thread
+    # never runs the close sweep itself - the REST round-trips happen on
+    # a worker while the network thread keeps draining (and dropping)
+    # frames until the socket is closed
+    if SHUTDOWN.is_set():
+        return
+    SHUTDOWN.set()
     logger.info("Market closed, stopping...")
-    TRADING_ACTIVE = False
-    closeAllPositions()
-    cancelAllOrders()
-    if ws:
-        ws.close()
+
+    def _shutdown_worker():
+        closeAllPositions()
+        cancelAllOrders()
+        if ws:
+            ws.close()
+
+    threading.Thread(target=_shutdown_worker, name='shutdown', daemon=True).start()
     
     def delayed_exit():
         time.sleep(2)
@@ -258,38 +537,54 @@ def stop_trading_and_exit(ws=None):
     
     threading.Thread(target=delayed_exit, daemon=True).start()
 
+def closeOnePosition(symbol, position):
+    """Cancel the stop loss and exit a single position (runs on the exit pool)"""
+    global kite
+
+    try:
+        # Cancel stop loss order if it exists
+        if 'stop_loss_order_id' in position:
+            try:
+                kite.cancel_order(order_id=position['stop_loss_order_id'], variety=kite.VARIETY_REGULAR)
+                logger.info("%s CANCELLED STOP LOSS %s", symbol, position['stop_loss_order_id'])
+            except Exception as e:
+                logger.error("%s CANCEL STOP LOSS FAILED: %s", symbol, e)
+
+        # Close the position
+        opposite_direction = kite.TRANSACTION_TYPE_SELL if position['direction'] == 'BUY' else kite.TRANSACTION_TYPE_BUY
+
+        order_id = kite.place_order(variety=kite.VARIETY_REGULAR, tradingsymbol=symbol,
+                                  exchange=kite.EXCHANGE_NSE, transaction_type=opposite_direction,
+                                  quantity=position['quantity'], order_type=kite.ORDER_TYPE_MARKET,
+                                  product=kite.PRODUCT_MIS, validity=kite.VALIDITY_DAY)
+
+        action = "SELL" if position['direction'] == 'BUY' else "BUY"
+        logger.info("%s CLOSE %s %s Qty:%d", symbol, action, order_id, position['quantity'])
+
+    except Exception as e:
+        logger.error("%s CLOSE FAILED: %s", symbol, e)
+
 def closeAllPositions():
     global POSITIONS_TAKEN, kite
-    
+
     if not POSITIONS_TAKEN:
         return
-    
-    logger.info(f"Closing {len(POSITIONS_TAKEN)} positions...")
-    
-    for symbol, position in POSITIONS_TAKEN.items():
-        try:
-            # Cancel stop loss order if it exists
-            if 'stop_loss_order_id' in position:
-                try:
-                    kite.cancel_order(order_id=position['stop_loss_order_id'], variety=kite.VARIETY_REGULAR)
-                    logger.info(f"{symbol} CANCELLED STOP LOSS {position['stop_loss_order_id']}")
-                except Exception as e:
-                    logger.error(f"{symbol} CANCEL STOP LOSS FAILED: {e}")
-            
-            # Close the position
-            opposite_direction = kite.TRANSACTION_TYPE_SELL if position['direction'] == 'BUY' else kite.TRANSACTION_TYPE_BUY
-            
-            order_id = kite.place_order(variety=kite.VARIETY_REGULAR, tradingsymbol=symbol,
-                                      exchange=kite.EXCHANGE_NSE, transaction_type=opposite_direction,
-                                      quantity=position['quantity'], order_type=kite.ORDER_TYPE_MARKET,
-                                      product=kite.PRODUCT_MIS, validity=kite.VALIDITY_DAY)
-            
-            action = "SELL" if position['direction'] == 'BUY' else "BUY"
-            logger.info(f"{symbol} CLOSE {action} {order_id} Qty:{position['quantity']}")
-            
-        except Exception as e:
-            logger.error(f"{symbol} CLOSE FAILED: {e}")
-    
+
+    logger.info("Closing %d positions...", len(POSITIONS_TAKEN))
+
+    # Submit all cancel+exit pairs concurrently so the N HTTPS round-trips
+    # overlap on kiteconnect's pooled keep-alive session instead of paying
+    # one full round-trip per symbol serially at market close. The pool is
+    # shut down without waiting so the 30s bound is real - a hung order
+    # call gets logged and left behind instead of holding shutdown.
+    pool = ThreadPoolExecutor(max_workers=32)
+    futures = [pool.submit(closeOnePosition, symbol, position)
+               for symbol, position in POSITIONS_TAKEN.items()]
+    _, pending = wait(futures, timeout=30)
+    if pending:
+        logger.error("%d close orders still in flight after 30s", len(pending))
+    pool.shutdown(wait=False)
+
     POSITIONS_TAKEN.clear()
 
 def cancelAllOrders():
@@ -303,17 +598,24 @@ def cancelAllOrders():
             logger.info("No open orders to cancel")
             return
         
-        logger.info(f"Cancelling {len(open_orders)} open orders...")
-        
-        for order in open_orders:
+        logger.info("Cancelling %d open orders...", len(open_orders))
+
+        def cancel_one(order):
             try:
                 kite.cancel_order(order_id=order['order_id'], variety=order['variety'])
-                logger.info(f"Cancelled {order['tradingsymbol']} {order['order_id']}")
+                logger.info("Cancelled %s %s", order['tradingsymbol'], order['order_id'])
             except Exception as e:
-                logger.error(f"Cancel failed {order['order_id']}: {e}")
+                logger.error("Cancel failed %s: %s", order['order_id'], e)
+
+        pool = ThreadPoolExecutor(max_workers=32)
+        futures = [pool.submit(cancel_one, order) for order in open_orders]
+        _, pending = wait(futures, timeout=30)
+        if pending:
+            logger.error("%d cancels still in flight after 30s", len(pending))
+        pool.shutdown(wait=False)
                 
     except Exception as e:
-        logger.error(f"Failed to fetch orders: {e}")
+        logger.error("Failed to fetch orders: %s", e)
 
 def main():
     global SYMBOLS, kite
@@ -331,7 +633,7 @@ def main():
     kite.set_access_token(args.access_token)
     
     SYMBOLS = [s.strip().upper() for s in args.symbols.split(',')]
-    logger.info(f"Symbols: {SYMBOLS}")
+    logger.info("Symbols: %s", SYMBOLS)
     
     initialize_token_mappings()
     
@@ -343,7 +645,7 @@ def main():
     mode_map = {'ltp': KiteTicker("", "").MODE_LTP, 'quote': KiteTicker("", "").MODE_QUOTE, 'full': KiteTicker("", "").MODE_FULL}
     mode = mode_map[args.mode]
     
-    logger.info(f"Starting {len(tokens)} symbols in {args.mode} mode")
+    logger.info("Starting %d symbols in %s mode", len(tokens), args.mode)
     kws_client = KiteWebSocket(args.api_key, args.access_token)
     kws_client.subscribe_tokens(tokens, mode)
     
@@ -354,7 +656,7 @@ def main():
     except SystemExit:
         kws_client.kws.close()
     except Exception as e:
-        logger.error(f"Error: {e}")
+        logger.error("Error: %s", e)
         kws_client.kws.close()
 
 if __name__ == "__main__":
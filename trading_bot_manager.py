@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Supervisor for the websocket trading bot
+Usage: python trading_bot_manager.py --api_key KEY --access_token TOKEN --symbols "TCS,INFY" [--mode ltp] [--restart-on-failure]
+
+Kills any stale kite_websocket.py processes, starts a fresh one, relays
+its output to trading_bot.log (manager events go to
+trading_bot_manager.log), and optionally restarts it when it dies
+outside market-close hours.
+"""
+
+import argparse
+import logging
+import os
+import select
+import signal
+import subprocess
+import sys
+import time
+
+class _CachedTimeFormatter(logging.Formatter):
+    """Formatter that re-runs strftime only when the second changes"""
+    _last_s = None
+    _last_str = ''
+
+    def formatTime(self, record, datefmt=None):
+        s = int(record.created)
+        if s != self._last_s:
+            self._last_s = s
+            self._last_str = time.strftime(datefmt or '%Y-%m-%d %H:%M:%S',
+                                           time.localtime(s))
+        return '%s,%03d' % (self._last_str, (record.created - s) * 1000)
+
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                   handlers=[logging.FileHandler('trading_bot_manager.log'), logging.StreamHandler(sys.stdout)])
+for _handler in logging.getLogger().handlers:
+    _handler.setFormatter(_CachedTimeFormatter('%(asctime)s - %(levelname)s - %(message)s'))
+logger = logging.getLogger(__name__)
+
+BOT_SCRIPT = 'kite_websocket.py'
+_NEEDLE = BOT_SCRIPT.encode()
+
+
+def _wait_pids(pids, timeout):
+    """Wait for PIDs to exit; returns the PIDs still alive at the deadline.
+
+    Uses pidfd_open + a single poll() so the kernel wakes us on the exact
+    death events instead of sleep-polling each PID in turn. Falls back to
+    psutil's wait loop when pidfds are unavailable (Python <3.9 or
+    kernel <5.3).
+    """
+    if not pids:
+        return []
+
+    if not hasattr(os, 'pidfd_open'):
+        import psutil
+        survivors = []
+        for pid in pids:
+            try:
+                psutil.Process(pid).wait(timeout=timeout)
+            except psutil.TimeoutExpired:
+                survivors.append(pid)
+            except psutil.NoSuchProcess:
+                pass
+        return survivors
+
+    poller = select.poll()
+    pid_of = {}
+    for pid in pids:
+        try:
+            fd = os.pidfd_open(pid)
+        except OSError:
+            continue  # already gone
+        poller.register(fd, select.POLLIN)
+        pid_of[fd] = pid
+
+    deadline = time.monotonic() + timeout
+    try:
+        while pid_of:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            for fd, _ in poller.poll(remaining * 1000):
+                poller.unregister(fd)
+                os.close(fd)
+                del pid_of[fd]
+        return list(pid_of.values())
+    finally:
+        for fd in pid_of:
+            try:
+                poller.unregister(fd)
+            except KeyError:
+                pass
+            os.close(fd)
+
+
+class TradingBotManager:
+    def __init__(self, bot_args):
+        self.bot_args = bot_args
+        self.process = None
+        self.shutdown_requested = False
+        # Wakeup pipe: the interpreter writes a byte here on signal
+        # delivery (set_wakeup_fd), turning SIGTERM/SIGINT into a poll
+        # event the monitor sees immediately
+        self._wake_r, wake_w = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+        signal.set_wakeup_fd(wake_w)
+        # Relayed bot output bypasses the logging framework (no LogRecord,
+        # no formatter, no per-line handler locking) and goes to its own
+        # file as raw bytes. Opened without O_APPEND - splice(2) rejects
+        # append-mode targets with EINVAL - with one seek to the end so
+        # output still accumulates across restarts; nothing else writes
+        # this file.
+        self._bot_log_fd = os.open('trading_bot.log', os.O_WRONLY | os.O_CREAT, 0o644)
+        os.lseek(self._bot_log_fd, 0, os.SEEK_END)
+        # Pump bot output kernel-to-kernel when the platform allows it;
+        # cleared at runtime if splice refuses the fd pair
+        self._use_splice = hasattr(os, 'splice')
+        self._residual = b''
+
+    def find_existing_processes(self):
+        """Find PIDs of already-running bot processes"""
+        # pgrep does the cmdline match in a tight C loop with no per-PID
+        # Python objects - cheapest option for this once-per-(re)start scan
+        try:
+            out = subprocess.run(['pgrep', '-f', BOT_SCRIPT],
+                                 capture_output=True, text=True, check=False).stdout
+            self_pid = os.getpid()
+            return [pid for pid in map(int, out.split()) if pid != self_pid]
+        except FileNotFoundError:
+            pass  # no pgrep on this host
+
+        if not os.path.isdir('/proc'):
+            return self._find_existing_psutil()
+
+        # Read only /proc/<pid>/cmdline per candidate instead of letting
+        # psutil build a full Process object (stat/status/cmdline reads)
+        # for every PID on the box. The needle is matched against the raw
+        # NUL-separated bytes - no join, no decode, no per-PID strings.
+        pids = []
+        self_pid = os.getpid()
+        for entry in os.scandir('/proc'):
+            if not entry.name.isdigit():
+                continue
+            pid = int(entry.name)
+            if pid == self_pid:
+                continue
+            try:
+                with open('/proc/%d/cmdline' % pid, 'rb', buffering=0) as f:
+                    cmdline = f.read()
+            except OSError:
+                continue  # raced with exit, or not ours to read
+            if _NEEDLE in cmdline:
+                pids.append(pid)
+        return pids
+
+    def _find_existing_psutil(self):
+        """Portable fallback for hosts without /proc"""
+        import psutil
+        pids = []
+        for proc in psutil.process_iter(['pid', 'cmdline']):
+            try:
+                cmdline = ' '.join(proc.info['cmdline'] or [])
+                if BOT_SCRIPT in cmdline and proc.info['pid'] != os.getpid():
+                    pids.append(proc.info['pid'])
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return pids
+
+    def kill_existing_processes(self):
+        """Terminate stale bot processes before starting a fresh one"""
+        pids = self.find_existing_processes()
+        if not pids:
+            return
+
+        # One SIGTERM pass over every PID, one pooled wait with a shared
+        # deadline, then one SIGKILL pass for survivors - worst case is a
+        # single timeout, not one per stale process
+        logger.info("Terminating %d stale bot process(es): %s", len(pids), pids)
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        survivors = _wait_pids(pids, timeout=10)
+        if survivors:
+            logger.warning("Force killing unresponsive PIDs: %s", survivors)
+            for pid in survivors:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+            _wait_pids(survivors, timeout=2)
+
+    def start_trading_bot(self):
+        cmd = [sys.executable, BOT_SCRIPT] + self.bot_args
+        logger.info("Starting bot: %s", ' '.join(cmd))
+        # Binary unbuffered pipe - the monitor drains it in large chunks
+        # instead of one read() per line. close_fds=False lets CPython
+        # spawn via posix_spawn (vfork) instead of fork+exec, so respawns
+        # don't clone the manager's page tables; it leaks nothing because
+        # Python-created fds are CLOEXEC by default (PEP 446).
+        self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                        bufsize=0, close_fds=False)
+        logger.info("Bot started with PID %d", self.process.pid)
+
+    def _pump_stdout(self, fd):
+        """Move available bot output to the log; returns True on EOF"""
+        if self._use_splice:
+            # Zero user-space copies: bytes go pipe -> page cache inside
+            # the kernel. No BOT: prefix or stdout mirror on this path -
+            # trading_bot.log is dedicated to bot output, and the manager
+            # runs under nohup with stdout discarded anyway.
+            try:
+                return os.splice(fd, self._bot_log_fd, 65536) == 0
+            except BlockingIOError:
+                return False
+            except OSError:
+                self._use_splice = False  # fall back to read/write relay
+        try:
+            chunk = os.read(fd, 16384)
+        except BlockingIOError:
+            return False
+        if not chunk:
+            return True
+        self._residual = self._relay_chunk(self._residual, chunk)
+        return False
+
+    def _relay_chunk(self, residual, chunk):
+        """Split a stdout chunk into lines, relay them, return the remainder"""
+        residual += chunk
+        lines = residual.split(b'\n')
+        residual = lines.pop()
+        if lines:
+            # One writev per stream for the whole burst - no join
+            # allocation and no write-then-flush double dispatch
+            bufs = [b'BOT: ' + line + b'\n' for line in lines]
+            os.writev(self._bot_log_fd, bufs)
+            os.writev(sys.stdout.buffer.fileno(), bufs)
+        return residual
+
+    def monitor_process(self):
+        """Relay bot output until it exits; returns the exit code"""
+        # Multiplex the stdout pipe with a pidfd for the child in one
+        # poller: output is drained in 16 KiB chunks, and exit is flagged
+        # by the kernel the moment it happens instead of being inferred
+        # from pipe EOF after the last buffered line.
+        fd = self.process.stdout.fileno()
+        # Nonblocking as a guard against spurious poll wakeups - a read
+        # that races an empty pipe returns EAGAIN instead of hanging the
+        # monitor
+        os.set_blocking(fd, False)
+        poller = select.poll()
+        poller.register(fd, select.POLLIN | select.POLLHUP)
+        poller.register(self._wake_r, select.POLLIN)
+        pidfd = os.pidfd_open(self.process.pid) if hasattr(os, 'pidfd_open') else None
+        if pidfd is not None:
+            poller.register(pidfd, select.POLLIN)
+
+        exited = False
+        try:
+            while not self.shutdown_requested and not exited:
+                # Fully event-driven: signals arrive via the wakeup pipe,
+                # so the poll can block with no timeout
+                for ready_fd, _ in poller.poll():
+                    if ready_fd == pidfd:
+                        exited = True
+                    elif ready_fd == self._wake_r:
+                        os.read(self._wake_r, 512)  # drain; flag is checked above
+                    elif self._pump_stdout(fd):
+                        exited = True
+            if exited:
+                # The child is gone, so the pipe can't block - drain any
+                # output it flushed on the way out
+                while not self._pump_stdout(fd):
+                    pass
+        finally:
+            if pidfd is not None:
+                os.close(pidfd)
+        if self._residual:
+            self._residual = self._relay_chunk(self._residual, b'\n')
+        return self.process.wait() if exited else self.process.poll()
+
+    def stop_trading_bot(self):
+        if self.process is None or self.process.poll() is not None:
+            return
+        logger.info("Stopping bot PID %d", self.process.pid)
+        self.process.terminate()
+        if _wait_pids([self.process.pid], timeout=15):
+            logger.warning("Bot did not exit in time, killing")
+            self.process.kill()
+        self.process.wait()
+
+    def signal_handler(self, signum, frame):
+        # Async-signal-safe: just flag the shutdown. The wakeup-fd byte
+        # breaks the monitor's poll, and main does the actual teardown.
+        self.shutdown_requested = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Supervisor for the websocket trading bot')
+    parser.add_argument('--api_key', required=True, help='Kite Connect API key')
+    parser.add_argument('--access_token', required=True, help='Access token')
+    parser.add_argument('--symbols', required=True, help='Comma-separated symbols')
+    parser.add_argument('--mode', default='ltp', help='Tick mode (ltp/quote/full)')
+    parser.add_argument('--restart-on-failure', action='store_true',
+                        help='Restart the bot if it exits with a non-zero code')
+    args = parser.parse_args()
+
+    bot_args = ['--api_key', args.api_key, '--access_token', args.access_token,
+                '--symbols', args.symbols, '--mode', args.mode]
+    manager = TradingBotManager(bot_args)
+
+    signal.signal(signal.SIGTERM, manager.signal_handler)
+    signal.signal(signal.SIGINT, manager.signal_handler)
+
+    while True:
+        manager.kill_existing_processes()
+        manager.start_trading_bot()
+        exit_code = manager.monitor_process()
+
+        if manager.shutdown_requested:
+            logger.info("Shutdown requested, stopping bot")
+            manager.stop_trading_bot()
+            break
+
+        logger.info("Bot exited with code %s", exit_code)
+        if exit_code == 0 or not args.restart_on_failure:
+            break
+        logger.info("Restarting in 5s...")
+        time.sleep(5)
+        # A signal during the sleep only sets the flag - honor it here,
+        # because the exec below would discard it with the address space
+        # and the fresh manager would keep respawning
+        if manager.shutdown_requested:
+            logger.info("Shutdown requested during restart delay, exiting")
+            break
+        # Re-exec ourselves rather than looping: the OS discards the whole
+        # address space, so RSS and any leaked state can't accumulate
+        # across restarts. All our fds are CLOEXEC and close at exec.
+        logging.shutdown()
+        os.execv(sys.executable, [sys.executable, os.path.abspath(__file__)] + sys.argv[1:])
+
+
+if __name__ == "__main__":
+    main()